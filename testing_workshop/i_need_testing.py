@@ -1,42 +1,139 @@
+import functools
+import mmap
+import os
 import random
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+from urllib.parse import quote_plus
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-def get_random_quote():
+# (connect, read) timeouts in seconds
+TIMEOUT = (3, 10)
+
+# Number of keep-alive connections kept per host. This is also the default number
+# of concurrent requests in create_memes, so every worker gets a pooled connection
+# instead of opening one that would be discarded once the pool is full
+POOL_MAXSIZE = 8
+
+# A single session is shared by all calls, so the TCP connection and TLS session
+# to zenquotes.io / apimeme.com are reused instead of being set up on every request
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_MAXSIZE, max_retries=Retry(total=3, backoff_factor=0.2))
+_SESSION.mount('http://', _ADAPTER)
+_SESSION.mount('https://', _ADAPTER)
+
+MEMES = (
+    "10-Guy",
+    "Advice-Dog",
+    "Actual-Advice-Mallard",
+    "Ancient-Aliens",
+    "Albert-Cagestein",
+    "Bad-Joke-Eel",
+    "1990s-First-World-Problems",
+    "American-Chopper-Argument",
+    "Back-In-My-Day",
+    "Awkward-Moment-Sealion",
+    "Castaway-Fire"
+)
+
+MEME_URL_TEMPLATE = "https://apimeme.com/meme?meme={}&top={}&bottom={}"
+
+# chunk size used when streaming meme images to disk
+STREAM_CHUNK_SIZE = 64 * 1024
+
+def ttl_cache(seconds: float):
+    """Cache the results of a function for the given number of seconds"""
+    def decorator(func):
+        cache = {}
+
+        @functools.wraps(func)
+        def wrapper(*args):
+            now = time.monotonic()
+            cached = cache.get(args)
+            if cached is not None and cached[1] > now:
+                return cached[0]
+
+            value = func(*args)
+            cache[args] = (value, now + seconds)
+            return value
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return decorator
+
+def fetch_random_quote():
     """Get a random quote from zenquotes.io"""
-    quote = requests.get('https://zenquotes.io/api/random')
+    quote = _SESSION.get('https://zenquotes.io/api/random', timeout=TIMEOUT)
     return quote.json()[0]['q']
 
+@ttl_cache(seconds=2)
+def get_random_quote():
+    """Get a random quote from zenquotes.io, reusing the last one for a couple of seconds"""
+    return fetch_random_quote()
+
 def construct_meme_url(meme_name: str, top_text: str, bottom_text: str):
-    return f"https://apimeme.com/meme?meme={meme_name}&top={top_text}&bottom={bottom_text}"
+    return MEME_URL_TEMPLATE.format(quote_plus(meme_name), quote_plus(top_text), quote_plus(bottom_text))
+
+def random_meme_url(top_text: str, bottom_text: str) -> str:
+    """Construct a url for a random meme template with the given text"""
+    return construct_meme_url(random.choice(MEMES), top_text, bottom_text)
 
 def generate_meme(top_text: str, bottom_text: str):
     """Generate a meme from apimeme.com"""
-    memes = [
-        "10-Guy",
-        "Advice-Dog",
-        "Actual-Advice-Mallard",
-        "Ancient-Aliens",
-        "Albert-Cagestein",
-        "Bad-Joke-Eel",
-        "1990s-First-World-Problems",
-        "American-Chopper-Argument",
-        "Back-In-My-Day",
-        "Awkward-Moment-Sealion",
-        "Castaway-Fire"
-    ]
-
-    random_meme = random.choice(memes)
-    url = construct_meme_url(random_meme, top_text, bottom_text)
-    meme = requests.get(url)
+    url = random_meme_url(top_text, bottom_text)
+    meme = _SESSION.get(url, timeout=TIMEOUT)
     return meme.content
 
+def stream_meme_to(path: str, top_text: str, bottom_text: str):
+    """Generate a meme from apimeme.com and stream it straight into a file.
+
+    The image is copied from the socket to the file in chunks, so it is never held
+    in memory as a whole like it is with generate_meme + save_meme."""
+    url = random_meme_url(top_text, bottom_text)
+    with _SESSION.get(url, timeout=TIMEOUT, stream=True) as response:
+        response.raise_for_status()
+        # let urllib3 undo any gzip/deflate transfer encoding while we read
+        response.raw.decode_content = True
+        with open(path, 'wb') as f:
+            shutil.copyfileobj(response.raw, f, STREAM_CHUNK_SIZE)
+
 def save_meme(meme: bytes):
     """Save the meme to a file"""
     f = open('meme.jpg', 'wb')
     f.write(meme)
 
+def save_meme_mmap(meme: bytes, path: str = 'meme.jpg'):
+    """Save the meme to a file by copying it into a memory map of the file.
+
+    The file is sized up front and the bytes are copied into the mapped pages,
+    leaving it to the OS to flush them to disk."""
+    with open(path, 'w+b') as f:
+        f.truncate(len(meme))
+        # an empty file can't be mapped, and there is nothing to copy anyway
+        if meme:
+            with mmap.mmap(f.fileno(), len(meme), access=mmap.ACCESS_WRITE) as mm:
+                mm[:] = meme
+
+def load_meme_mmap(path: str = 'meme.jpg') -> mmap.mmap:
+    """Open a saved meme as a read-only memory map, so it can be parsed in place.
+
+    The caller is responsible for closing the returned map. Raises ValueError for an
+    empty meme file, since an empty file can't be mapped."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError(f"{path} is empty, there is no meme to map")
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
 def generate_meme_headings(quote: str) -> tuple[str, str]:
     """Generate the top and bottom text for the meme, splitting the quote in half word-wise"""
+    if not quote:
+        return '', ''
+
     words = quote.split()
     half = len(words) // 2
     top_text = ' '.join(words[:half])
@@ -44,12 +141,54 @@ def generate_meme_headings(quote: str) -> tuple[str, str]:
 
     return top_text, bottom_text
 
-def create_meme():
-    """Create a meme from a random quote"""
-    quote = get_random_quote()
+def generate_random_meme() -> bytes:
+    """Generate a meme from a fresh random quote"""
+    quote = fetch_random_quote()
+    top_text, bottom_text = generate_meme_headings(quote)
+    return generate_meme(top_text, bottom_text)
+
+def create_meme(quote: Optional[str] = None):
+    """Create a meme from the given quote, or from a random quote if none is given"""
+    if quote is None:
+        quote = get_random_quote()
+    top_text, bottom_text = generate_meme_headings(quote)
+    stream_meme_to('meme.jpg', top_text, bottom_text)
+
+def create_memes(n: int, max_workers: int = POOL_MAXSIZE) -> list[bytes]:
+    """Generate n memes from random quotes concurrently.
+
+    The requests are I/O bound, so they are fanned out over a thread pool that
+    shares the pooled session instead of being made one after another.
+    """
+    if n <= 0:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(n, max_workers)) as executor:
+        return list(executor.map(lambda _: generate_random_meme(), range(n)))
+
+def create_meme_file(index: int) -> str:
+    """Create a meme from a fresh random quote and save it to meme_{index}.jpg"""
+    path = f'meme_{index}.jpg'
+    quote = fetch_random_quote()
     top_text, bottom_text = generate_meme_headings(quote)
-    meme = generate_meme(top_text, bottom_text)
-    save_meme(meme)
+    stream_meme_to(path, top_text, bottom_text)
+    return path
+
+def _reset_session():
+    """Drop pooled connections inherited from the parent process, so a worker opens its own"""
+    _SESSION.close()
+
+def generate_many(n: int, max_workers: int = 8) -> list[str]:
+    """Create n memes in worker processes, saved to meme_0.jpg ... meme_{n-1}.jpg.
+
+    Every worker has its own interpreter and connection pool, so response handling is
+    not serialized by the GIL. Workers write their memes to disk themselves, so the
+    images are never pickled back to this process. Returns the paths of the memes."""
+    if n <= 0:
+        return []
+
+    with ProcessPoolExecutor(max_workers=min(n, max_workers), initializer=_reset_session) as executor:
+        return list(executor.map(create_meme_file, range(n)))
 
 if __name__ == "__main__":
     create_meme()
\ No newline at end of file
@@ -1,13 +1,37 @@
 
-from typing import Optional
+from itertools import islice
+from typing import Iterable, Optional
+from sqlalchemy import Row, select
 from testing_workshop.model import Metric, Session
 
+# SQLite allows at most 999 bound parameters per statement on older builds
+IN_QUERY_CHUNK_SIZE = 900
+
+
+def insert_metrics(metrics: Iterable[Metric], batch_size: Optional[int] = None):
+    """Inserts a list of metrics into the database.
+
+    By default all metrics are added to the session in one go. With batch_size set,
+    metrics are bulk saved in chunks of that size, which skips per-object bookkeeping
+    and keeps memory bounded for very large inputs."""
+    if batch_size is not None and batch_size < 1:
+        raise ValueError(f"batch_size must be at least 1, got {batch_size}")
 
-def insert_metrics(metrics: list[Metric]):
-    """Inserts a list of metrics into the database"""
     session = Session()
-    for metric in metrics:
-        session.add(metric)
+    if batch_size is None:
+        session.add_all(metrics)
+    else:
+        metrics = iter(metrics)
+        while batch := list(islice(metrics, batch_size)):
+            session.bulk_save_objects(batch)
+    session.commit()
+
+def insert_metric_dicts(rows: list[dict]):
+    """Inserts metrics given as {"name": ..., "value": ...} dicts into the database.
+
+    No Metric instances are created, which keeps memory low for large bulk loads."""
+    session = Session()
+    session.bulk_insert_mappings(Metric, rows)
     session.commit()
 
 def find_metric_by_name(name: str) -> Optional[Metric]:
@@ -15,6 +39,32 @@ def find_metric_by_name(name: str) -> Optional[Metric]:
     session = Session()
     return session.query(Metric).filter(Metric.name == name).first()
 
+def find_metrics_by_names(names: Iterable[str]) -> dict[str, Metric]:
+    """Returns the metrics with the given names keyed by name, leaving out names that are not found.
+
+    Issues one IN query per chunk of names instead of one query per name. If several
+    metrics share a name, the first one inserted is returned."""
+    session = Session()
+    names = list(dict.fromkeys(names))
+    found = {}
+    for start in range(0, len(names), IN_QUERY_CHUNK_SIZE):
+        chunk = names[start:start + IN_QUERY_CHUNK_SIZE]
+        for metric in session.query(Metric).filter(Metric.name.in_(chunk)).order_by(Metric.id):
+            found.setdefault(metric.name, metric)
+    return found
+
+def find_metric_row(name: str) -> Optional[Row]:
+    """Returns the (id, name, value) row of a metric with the given name, or None if not found.
+
+    Uses a Core select instead of the ORM, so no Metric instance is hydrated. Use
+    find_metric_by_name when you need an entity attached to the session.
+    The select runs through the session, so it sees (and doesn't roll back) any
+    pending changes of the session's open transaction."""
+    metrics_table = Metric.__table__
+    return Session().execute(
+        select(metrics_table).where(metrics_table.c.name == name).limit(1)
+    ).first()
+
 def insert_metric_normalized_name(metric: Metric):
     """Inserts a metric into the database, with the name normalized to lowercase"""
     session = Session()
@@ -22,13 +72,25 @@ def insert_metric_normalized_name(metric: Metric):
     session.add(metric)
     session.commit()
 
+def insert_metric_normalized_name_bulk(metrics: Iterable[Metric]):
+    """Inserts metrics into the database, with their names normalized to lowercase.
+
+    The rows are inserted from plain mappings, so the given metrics are neither modified
+    nor tracked by the session, which skips attribute history and flush-time dirty checks."""
+    insert_metric_dicts([{"name": metric.name.lower(), "value": metric.value} for metric in metrics])
+
 def find_and_square_metric(name: str) -> Optional[Metric]:
-    """Finds a metric with the given name, squares its value, and returns it."""
-    metric = find_metric_by_name(name)
+    """Finds a metric with the given name, squares its value, normalizes its name and returns it.
+
+    The lookup and the update happen in one session and one transaction instead of a
+    separate find and insert round trip. The select asks for FOR UPDATE, which locks the
+    row on databases that support it; SQLite doesn't, so no row lock is taken there."""
+    session = Session()
+    metric = session.query(Metric).filter(Metric.name == name).with_for_update().first()
 
     if metric:
         metric.value = metric.value ** 2 # side effect!!!
+        metric.name = metric.name.lower()
+        session.commit()
 
-    insert_metric_normalized_name(metric)
-
-    return metric
\ No newline at end of file
+    return metric
@@ -1,17 +1,21 @@
+import os
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy import Column, Integer, String, ForeignKey, create_engine
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import scoped_session, sessionmaker
 from typing import Optional
 
-engine = create_engine('sqlite:///:memory:', echo=True)
+# set SQL_ECHO to 1, true or yes to log every statement while debugging
+engine = create_engine('sqlite:///:memory:', echo=os.environ.get('SQL_ECHO', '').lower() in ('1', 'true', 'yes'))
 Base = declarative_base()
-Session = sessionmaker(bind=engine)
+# Session() hands back the same session for the current thread, so consecutive
+# calls share one connection and identity map instead of starting from scratch
+Session = scoped_session(sessionmaker(bind=engine))
 
 class Metric(Base):
     __tablename__ = 'metrics'
     id = Column(Integer, primary_key=True)
-    name = Column(String)
+    name = Column(String(128), index=True)
     value = Column(Integer)
 
     def __repr__(self):
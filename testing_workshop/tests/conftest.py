@@ -1,6 +1,6 @@
 import pytest
 
-from ..model import Metric
+from ..model import Base, Metric, Session, create_db, engine
 
 # Fixtures are a very useful abstraction in pytest, and one of the features that 
 # makes it so powerful.
@@ -31,6 +31,16 @@ def metrics():
 def metrics_with_duplicate(metrics):
     return metrics + [Metric(name="foo", value=1)]
 
+# Fixtures can also clean up after themselves: everything after yield runs
+# once the test is done, even if it failed.
+@pytest.fixture
+def db_session():
+    create_db()
+    yield Session()
+    # Session is thread-scoped, so drop it to not leak its state into other tests
+    Session.remove()
+    Base.metadata.drop_all(engine)
+
 @pytest.fixture(scope="session")
 def quote():
     return [ {"q":"123","a":"Michael Jordan","h":"<blockquote>&ldquo;Learning is a gift, even when pain is your teacher.&rdquo; &mdash; <footer>Michael Jordan</footer></blockquote>"} ]
\ No newline at end of file
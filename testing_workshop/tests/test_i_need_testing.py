@@ -1,33 +1,62 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
-from ..i_need_testing import get_random_quote, construct_meme_url, generate_meme, save_meme, create_meme
+from ..i_need_testing import get_random_quote, fetch_random_quote, construct_meme_url, generate_meme, save_meme, save_meme_mmap, generate_meme_headings, load_meme_mmap, stream_meme_to, create_meme, create_memes, create_meme_file, generate_many
 
 @pytest.mark.meme_tests
 def test_get_random_qote(quote, mocker):
     # setup data
-    requests_get_path = mocker.patch("testing_workshop.i_need_testing.requests")
-    requests_get_path.get.return_value.json.return_value = quote
+    session_path = mocker.patch("testing_workshop.i_need_testing._SESSION")
+    session_path.get.return_value.json.return_value = quote
+
+    # the quote is cached, so make sure we don't get one from a previous test
+    get_random_quote.cache_clear()
 
     # run code
     result = get_random_quote()
 
     # assert result
-    requests_get_path.get.assert_called_once()
+    session_path.get.assert_called_once()
     assert result == quote[0]["q"]
 
+@pytest.mark.meme_tests
+def test_get_random_quote_is_cached(quote, mocker):
+    session_path = mocker.patch("testing_workshop.i_need_testing._SESSION")
+    session_path.get.return_value.json.return_value = quote
+    get_random_quote.cache_clear()
+
+    assert get_random_quote() == get_random_quote() == quote[0]["q"]
+    session_path.get.assert_called_once()
+
+@pytest.mark.meme_tests
+def test_fetch_random_quote_is_not_cached(quote, mocker):
+    session_path = mocker.patch("testing_workshop.i_need_testing._SESSION")
+    session_path.get.return_value.json.return_value = quote
+
+    fetch_random_quote()
+    fetch_random_quote()
+
+    assert session_path.get.call_count == 2
 
 @pytest.mark.meme_tests
 def test_construct_meme_url():
     url = construct_meme_url("10-Guy", "top", "bottom")
     assert url == "https://apimeme.com/meme?meme=10-Guy&top=top&bottom=bottom"
 
+@pytest.mark.meme_tests
+def test_construct_meme_url_quotes_text():
+    url = construct_meme_url("Guy & Dog", "to be or", "not & to=be?")
+    assert url == "https://apimeme.com/meme?meme=Guy+%26+Dog&top=to+be+or&bottom=not+%26+to%3Dbe%3F"
+
 @pytest.mark.meme_tests
 def test_generate_meme(mocker):
-    requests_get_path = mocker.patch("testing_workshop.i_need_testing.requests")
-    requests_get_path.get.return_value.content = b"meme"
+    session_path = mocker.patch("testing_workshop.i_need_testing._SESSION")
+    session_path.get.return_value.content = b"meme"
 
     result = generate_meme("top", "bottom")
 
-    requests_get_path.get.assert_called_once()
+    session_path.get.assert_called_once()
     assert result == b"meme"
 
 @pytest.mark.meme_tests
@@ -38,23 +67,108 @@ def test_save_meme(mocker):
     mock_open.assert_called_once_with("meme.jpg", "wb")
     mock_open.return_value.write.assert_called_once_with(b"meme")
 
+@pytest.mark.meme_tests
+def test_save_and_load_meme_mmap(tmp_path):
+    path = tmp_path / "meme.jpg"
+    save_meme_mmap(b"meme", path)
+
+    assert path.read_bytes() == b"meme"
+    with load_meme_mmap(path) as meme:
+        assert meme[:] == b"meme"
+
+    # an empty meme is saved as an empty file, but can't be mapped back
+    save_meme_mmap(b"", path)
+
+    assert path.read_bytes() == b""
+    with pytest.raises(ValueError, match="is empty"):
+        load_meme_mmap(path)
+
+@pytest.mark.meme_tests
+def test_stream_meme_to(mocker, tmp_path):
+    session_path = mocker.patch("testing_workshop.i_need_testing._SESSION")
+    response = session_path.get.return_value.__enter__.return_value
+    response.raw = io.BytesIO(b"meme")
+
+    path = tmp_path / "meme.jpg"
+    stream_meme_to(path, "top", "bottom")
+
+    session_path.get.assert_called_once()
+    response.raise_for_status.assert_called_once()
+    assert path.read_bytes() == b"meme"
+
+@pytest.mark.meme_tests
+@pytest.mark.parametrize("quote, headings", [
+    ("", ("", "")),
+    ("   ", ("", "")),
+    ("Learning", ("", "Learning")),
+    ("Learning is a gift", ("Learning is", "a gift")),
+    ("Learning  is\ta gift.", ("Learning is", "a gift.")),
+])
+def test_generate_meme_headings(quote, headings):
+    assert generate_meme_headings(quote) == headings
+
 @pytest.mark.meme_tests
 def test_create_meme(mocker):
     get_random_quote_path = mocker.patch("testing_workshop.i_need_testing.get_random_quote")
     generate_meme_headings_path = mocker.patch("testing_workshop.i_need_testing.generate_meme_headings")
-    generate_meme_path = mocker.patch("testing_workshop.i_need_testing.generate_meme")
-    save_meme_path = mocker.patch("testing_workshop.i_need_testing.save_meme")
+    stream_meme_to_path = mocker.patch("testing_workshop.i_need_testing.stream_meme_to")
 
     get_random_quote_path.return_value = "quote"
     generate_meme_headings_path.return_value = "top", "bottom"
-    generate_meme_path.return_value = b"meme"
 
     create_meme()
 
     get_random_quote_path.assert_called_once()
     generate_meme_headings_path.assert_called_once_with("quote")
-    generate_meme_path.assert_called_once_with("top", "bottom")
-    save_meme_path.assert_called_once_with(b"meme")
+    stream_meme_to_path.assert_called_once_with("meme.jpg", "top", "bottom")
+
+@pytest.mark.meme_tests
+def test_create_meme_with_quote(mocker):
+    get_random_quote_path = mocker.patch("testing_workshop.i_need_testing.get_random_quote")
+    stream_meme_to_path = mocker.patch("testing_workshop.i_need_testing.stream_meme_to")
+
+    create_meme("quote of the day")
+
+    get_random_quote_path.assert_not_called()
+    stream_meme_to_path.assert_called_once_with("meme.jpg", "quote of", "the day")
+
+@pytest.mark.meme_tests
+def test_create_memes(mocker):
+    fetch_random_quote_path = mocker.patch("testing_workshop.i_need_testing.fetch_random_quote")
+    generate_meme_path = mocker.patch("testing_workshop.i_need_testing.generate_meme")
+
+    fetch_random_quote_path.return_value = "quote of the day"
+    generate_meme_path.return_value = b"meme"
+
+    result = create_memes(3)
+
+    assert result == [b"meme"] * 3
+    assert fetch_random_quote_path.call_count == 3
+    generate_meme_path.assert_called_with("quote of", "the day")
+
+@pytest.mark.meme_tests
+def test_create_memes_empty(mocker):
+    fetch_random_quote_path = mocker.patch("testing_workshop.i_need_testing.fetch_random_quote")
+
+    assert create_memes(0) == []
+    fetch_random_quote_path.assert_not_called()
+
+@pytest.mark.meme_tests
+def test_create_meme_file(mocker):
+    fetch_random_quote_path = mocker.patch("testing_workshop.i_need_testing.fetch_random_quote")
+    stream_meme_to_path = mocker.patch("testing_workshop.i_need_testing.stream_meme_to")
+    fetch_random_quote_path.return_value = "quote of the day"
+
+    assert create_meme_file(3) == "meme_3.jpg"
+    stream_meme_to_path.assert_called_once_with("meme_3.jpg", "quote of", "the day")
+
+@pytest.mark.meme_tests
+def test_generate_many(mocker):
+    # mocks don't cross process boundaries, so run the workers as threads instead
+    mocker.patch("testing_workshop.i_need_testing.ProcessPoolExecutor", ThreadPoolExecutor)
+    create_meme_file_path = mocker.patch("testing_workshop.i_need_testing.create_meme_file")
+    create_meme_file_path.side_effect = lambda index: f"meme_{index}.jpg"
 
+    result = generate_many(3)
 
-    
+    assert result == ["meme_0.jpg", "meme_1.jpg", "meme_2.jpg"]
@@ -1,4 +1,6 @@
-from ..metrics import insert_metrics, find_metric_by_name, insert_metric_normalized_name, find_and_square_metric
+import pytest
+from ..model import Metric
+from ..metrics import insert_metrics, insert_metric_dicts, find_metric_by_name, find_metrics_by_names, find_metric_row, insert_metric_normalized_name, insert_metric_normalized_name_bulk, find_and_square_metric
 
 # Mocking in Python is the act of replacing a real object with a fake or mock object.
 # Mocking is a powerful technique to isolate code during unit testing.
@@ -81,19 +83,92 @@ def test_insert_with_mocked_session(metrics, mocker):
     # that the mock object was called exactly once.
     session_patch.assert_called_once()
 
-    # we can also assert that session add was called
+    # we can also assert that session add_all was called
     # with the metrics we passed in
-    assert session_patch.return_value.add.call_count == len(metrics)
-
-    # asssert that we have called add on each of the metrics
-    for metric in metrics:
-        session_patch.return_value.add.assert_any_call(metric)
+    session_patch.return_value.add_all.assert_called_once_with(metrics)
 
     # we can also assert that session commit was called
     assert session_patch.return_value.commit.call_count == 1
 
     # return_value is a property on a mock object that allows us to
     # access the return value of the mock object when it is called as a function.
+
+def test_insert_in_batches_with_mocked_session(metrics, mocker):
+    session_patch = mocker.patch("testing_workshop.metrics.Session")
+    insert_metrics(metrics, batch_size=2)
+
+    # 3 metrics in batches of 2 means two bulk saves and a single commit
+    bulk_save_objects = session_patch.return_value.bulk_save_objects
+    assert bulk_save_objects.call_count == 2
+    bulk_save_objects.assert_any_call(metrics[:2])
+    bulk_save_objects.assert_any_call(metrics[2:])
+    assert session_patch.return_value.commit.call_count == 1
+
+@pytest.mark.parametrize("batch_size", [0, -1])
+def test_insert_with_invalid_batch_size(metrics, batch_size, mocker):
+    session_patch = mocker.patch("testing_workshop.metrics.Session")
+
+    # pytest.raises asserts that the code inside the block raises the given exception
+    with pytest.raises(ValueError):
+        insert_metrics(metrics, batch_size=batch_size)
+
+    session_patch.return_value.commit.assert_not_called()
+
+def test_insert_dicts_with_mocked_session(mocker):
+    session_patch = mocker.patch("testing_workshop.metrics.Session")
+    rows = [{"name": "foo", "value": 1}, {"name": "bar", "value": 2}]
+
+    insert_metric_dicts(rows)
+
+    session_patch.return_value.bulk_insert_mappings.assert_called_once_with(Metric, rows)
+    session_patch.return_value.commit.assert_called_once()
+
+def test_insert_normalized_bulk_with_mocked_session(mocker):
+    session_patch = mocker.patch("testing_workshop.metrics.Session")
+    metrics = [Metric(name="Foo", value=1), Metric(name="BAR", value=2)]
+
+    insert_metric_normalized_name_bulk(metrics)
+
+    session_patch.return_value.bulk_insert_mappings.assert_called_once_with(
+        Metric, [{"name": "foo", "value": 1}, {"name": "bar", "value": 2}]
+    )
+    session_patch.return_value.commit.assert_called_once()
+    # the metrics we passed in are left untouched
+    assert metrics[0].name == "Foo"
+#endregion
+
+# side_effect lets a mock return a different value on every call
+#region
+def test_find_metrics_by_names_in_chunks(metrics_with_duplicate, mocker):
+    mocker.patch("testing_workshop.metrics.IN_QUERY_CHUNK_SIZE", 2)
+    session_patch = mocker.patch("testing_workshop.metrics.Session")
+    order_by = session_patch.return_value.query.return_value.filter.return_value.order_by
+    # first chunk is foo and bar, second chunk is baz
+    order_by.side_effect = [metrics_with_duplicate[:2] + metrics_with_duplicate[3:], metrics_with_duplicate[2:3]]
+
+    result = find_metrics_by_names(["foo", "bar", "foo", "baz"])
+
+    # three distinct names in chunks of two is two queries
+    assert order_by.call_count == 2
+    # the first foo wins over its duplicate
+    assert result == {"foo": metrics_with_duplicate[0], "bar": metrics_with_duplicate[1], "baz": metrics_with_duplicate[2]}
+#endregion
+
+# sometimes it is simpler to run against a real database.
+# Our engine is an in-memory SQLite, so it's fast and the db_session fixture
+# only has to create the tables before the test and drop them afterwards
+#region
+def test_find_metric_row_with_in_memory_db(db_session):
+    db_session.add(Metric(name="find_metric_row", value=7))
+    db_session.flush()
+
+    # the lookup sees the pending row and must not roll back the open transaction
+    row = find_metric_row("find_metric_row")
+    db_session.commit()
+
+    assert (row.name, row.value) == ("find_metric_row", 7)
+    assert find_metric_row("missing_metric_row") is None
+    assert find_metric_by_name("find_metric_row").value == 7
 #endregion
 
 # if you write testable code, you can also easily
@@ -101,25 +176,32 @@ def test_insert_with_mocked_session(metrics, mocker):
 #region
 def test_find_and_square_metric(metrics, mocker):
     original_metric_val = metrics[0].value
-    # let's mock the find_metric_by_name function
-    find_metric_by_name_patch = mocker.patch("testing_workshop.metrics.find_metric_by_name")
-    # we will conveniently make it return the first metric from our metrics fixture
-    find_metric_by_name_patch.return_value = metrics[0]
-
-    # let's mock the insert_metric_normalized_name function
-    insert_metric_normalized_name_patch = mocker.patch("testing_workshop.metrics.insert_metric_normalized_name")
+    # let's mock the Session
+    session_patch = mocker.patch("testing_workshop.metrics.Session")
+    # mocks can be chained: every attribute and call returns another mock.
+    # We will conveniently make the query return the first metric from our metrics fixture
+    query_patch = session_patch.return_value.query.return_value
+    query_patch.filter.return_value.with_for_update.return_value.first.return_value = metrics[0]
 
     # now, let's call the method we want to test
     result = find_and_square_metric("metric1")
 
-    # assert that find_metric_by_name was called once
-    find_metric_by_name_patch.assert_called_once_with("metric1")
+    # assert that we have queried for metrics
+    session_patch.return_value.query.assert_called_once_with(Metric)
 
-    # assert that insert_metric_normalized_name was called once
-    insert_metric_normalized_name_patch.assert_called_once()
+    # assert that the changes were committed once
+    session_patch.return_value.commit.assert_called_once()
 
     # assert that the metric was squared
     assert result.value == original_metric_val ** 2
+
+def test_find_and_square_missing_metric(mocker):
+    session_patch = mocker.patch("testing_workshop.metrics.Session")
+    query_patch = session_patch.return_value.query.return_value
+    query_patch.filter.return_value.with_for_update.return_value.first.return_value = None
+
+    assert find_and_square_metric("metric1") is None
+    session_patch.return_value.commit.assert_not_called()
 #endregion
 
 # PyTest CLI magic
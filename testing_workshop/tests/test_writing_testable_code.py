@@ -0,0 +1,59 @@
+import math
+
+import pytest
+from ..writing_testable_code import Item, ShoppingCart, FrozenShoppingCart, make_pipeline
+
+@pytest.fixture
+def items():
+    return [Item("apple", 0.1), Item("banana", 0.2), Item("cherry", 0.7)]
+
+def test_from_items_total(items):
+    cart = ShoppingCart.from_items(items)
+    assert cart.calculate_total_price() == math.fsum(item.price for item in items)
+
+def test_add_item_total_matches_fsum():
+    cart = ShoppingCart()
+    for _ in range(10):
+        cart.add_item(Item("apple", 0.1))
+    assert cart.calculate_total_price() == math.fsum([0.1] * 10) == 1.0
+
+def test_freeze(items):
+    cart = ShoppingCart.from_items(items)
+    frozen = cart.freeze()
+
+    assert frozen.items == tuple(items)
+    assert frozen.calculate_total_price() == math.fsum(item.price for item in items)
+
+def test_frozen_carts_with_equal_contents_are_equal(items):
+    first = FrozenShoppingCart(items)
+    second = ShoppingCart.from_items(items).freeze()
+
+    assert first == second
+    assert hash(first) == hash(second)
+    assert {first: "checked out"}[second] == "checked out"
+    assert first != FrozenShoppingCart(items[:2])
+
+def test_frozen_cart_defers_comparison_to_other_types(items):
+    frozen = FrozenShoppingCart(items)
+
+    assert frozen.__eq__(tuple(items)) is NotImplemented
+    assert frozen != tuple(items)
+
+def test_frozen_cart_items_are_read_only(items):
+    frozen = FrozenShoppingCart(items)
+    with pytest.raises(AttributeError):
+        frozen.items = ()
+
+def test_make_pipeline_runs_stages_in_order():
+    calls = []
+
+    def fake_stage(name):
+        def stage(data):
+            calls.append(name)
+            return data + [name]
+        return stage
+
+    pipeline = make_pipeline(fake_stage("clean"), fake_stage("analyze"), fake_stage("save"))
+
+    assert pipeline(["data"]) == ["data", "clean", "analyze", "save"]
+    assert calls == ["clean", "analyze", "save"]
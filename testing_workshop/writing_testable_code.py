@@ -62,6 +62,8 @@ def increment_counter():
     analyze_data()
     counter += 1
 
+import copy
+
 # Example: A function with side effects that should be made explicit
 def process_data(data):
     # Step 1: Clean the data
@@ -85,11 +87,21 @@ def analyze_data(data):
     pass
     
 def save_results(results):
-    new_results = results.deepcopy()
+    # a shallow copy is enough to avoid mutating the caller's results,
+    # without recursively copying everything inside them
+    new_results = copy.copy(results)
     # Code to save the results goes here
     # Return the new state of the program
     return new_results
 
+# The steps can also be passed in, which lets tests swap any of them for a fake.
+# The returned function holds the steps in a closure, so calling it once per record
+# doesn't look up three module globals every time
+def make_pipeline(clean, analyze, save):
+    def pipeline(data):
+        return save(analyze(clean(data)))
+    return pipeline
+
 #endregion
 
 # Avoid tight coupling
@@ -158,7 +170,11 @@ user1.save()
 # For example, instead of using a list to store data that is modified frequently, 
 # use a tuple or a named tuple that cannot be modified.
 
+from collections import Counter
+
 class CartItem:
+    __slots__ = ("name",)
+
     def __init__(self, name):
         self.name = name
         
@@ -167,13 +183,21 @@ class CartItem:
     
 class ShoppingCart:
     def __init__(self):
-        self.items = []
+        # item -> quantity, so removing an item is a hash lookup instead of a list scan
+        self.items = Counter()
 
     def add_item(self, item):
-        self.items.append(item)
+        self.items[item] += 1
 
     def remove_item(self, item):
-        self.items.remove(item)
+        # Counter ignores deleting a missing key, so fail like list.remove would
+        if item not in self.items:
+            raise ValueError(f"{item!r} is not in the cart")
+        quantity = self.items[item]
+        if quantity > 1:
+            self.items[item] = quantity - 1
+        else:
+            del self.items[item]
 
 cart = ShoppingCart()
 apple = CartItem("apple")
@@ -184,33 +208,46 @@ cart.remove_item(apple)
 
 print(cart.items)
 
-# In the above example, the items list in the ShoppingCart class is mutable. 
-# This can lead to unexpected behavior if the list is modified in one part 
+# In the above example, the items in the ShoppingCart class are mutable. 
+# This can lead to unexpected behavior if an item is modified in one part 
 # of the code and then accessed in another part of the code.
+# Note that cart.items is a Counter of item -> quantity rather than a list, so it
+# prints as Counter({banana: 1}) and iterating over it yields every item only once.
+# Use cart.items.elements() to get an item repeated as many times as it was added.
 
 # Fix:
 # region
-from collections import namedtuple
+from typing import NamedTuple
 
-Item = namedtuple("Item", ["name", "price"])
+class Item(NamedTuple):
+    name: str
+    price: float
 
 class ShoppingCart:
     def __init__(self):
-        self.items = []
+        # item -> quantity, so removing an item is a hash lookup instead of a list scan
+        self.items = Counter()
 
     def add_item(self, item):
-        self.items.append(item)
+        self.items[item] += 1
 
     def remove_item(self, item):
-        self.items.remove(item)
+        # Counter ignores deleting a missing key, so fail like list.remove would
+        if item not in self.items:
+            raise ValueError(f"{item!r} is not in the cart")
+        quantity = self.items[item]
+        if quantity > 1:
+            self.items[item] = quantity - 1
+        else:
+            del self.items[item]
 
 cart = ShoppingCart()
 cart.add_item(Item("apple", 1.0))
 cart.add_item(Item("banana", 2.0))
 cart.remove_item(Item("apple", 1.0))
 
-# In the above example, the items list in the ShoppingCart class is replaced with 
-# a list of named tuples. Named tuples are immutable, so the items list 
+# In the above example, the items in the ShoppingCart class are replaced with 
+# named tuples. Named tuples are immutable, so an item in the cart 
 # cannot be modified after it is created. 
 # This avoids mutable state and makes the code easier to reason about.
 # endregion
@@ -264,18 +301,73 @@ log("This is a debug message", debug=True, log_level="INFO")
 # This makes it easier to test code in isolation, 
 # because you can replace the dependencies with mock objects or test doubles.
 
+import math
+from collections import deque
+from operator import attrgetter
+
+# fetches item.price in C, so map(get_price, items) needs no Python-level loop
+get_price = attrgetter("price")
+
+class FrozenShoppingCart:
+    # a checked out cart can't change, so its total and hash are computed once
+    __slots__ = ("_items", "_total", "_hash")
+
+    def __init__(self, items):
+        self._items = tuple(items)
+        self._total = math.fsum(map(get_price, self._items))
+        self._hash = hash(self._items)
+
+    @property
+    def items(self):
+        # read-only, so the cached total and hash can't go stale
+        return self._items
+
+    def __eq__(self, other):
+        if not isinstance(other, FrozenShoppingCart):
+            return NotImplemented
+        return self._items == other._items
+
+    def __hash__(self):
+        return self._hash
+
+    def calculate_total_price(self):
+        return self._total
+
 class ShoppingCart:
     def __init__(self):
-        self.items = []
+        # items are only appended and iterated, which a deque does without
+        # ever reallocating and copying the whole container as it grows
+        self.items = deque()
+        # the total is kept up to date as items are added,
+        # so asking for it doesn't have to visit every item.
+        # _error collects the rounding error of each addition (Neumaier summation),
+        # so the total matches math.fsum (ten items at 0.1 cost 1.0, not 0.9999999999999999)
+        self._total = 0.0
+        self._error = 0.0
+
+    @classmethod
+    def from_items(cls, items):
+        # builds a whole cart at once instead of calling add_item for every item
+        cart = cls()
+        cart.items = deque(items)
+        cart._total = math.fsum(map(get_price, cart.items))
+        return cart
 
     def add_item(self, item):
         self.items.append(item)
+        price = item.price
+        total = self._total + price
+        if abs(self._total) >= abs(price):
+            self._error += (self._total - total) + price
+        else:
+            self._error += (price - total) + self._total
+        self._total = total
 
     def calculate_total_price(self):
-        total_price = 0
-        for item in self.items:
-            total_price += item.price
-        return total_price
+        return self._total + self._error
+
+    def freeze(self):
+        return FrozenShoppingCart(self.items)
 
 class Order:
     def __init__(self):
@@ -300,16 +392,39 @@ total_price = order.calculate_total_price()
 # region
 class ShoppingCart:
     def __init__(self):
-        self.items = []
+        # items are only appended and iterated, which a deque does without
+        # ever reallocating and copying the whole container as it grows
+        self.items = deque()
+        # the total is kept up to date as items are added,
+        # so asking for it doesn't have to visit every item.
+        # _error collects the rounding error of each addition (Neumaier summation),
+        # so the total matches math.fsum (ten items at 0.1 cost 1.0, not 0.9999999999999999)
+        self._total = 0.0
+        self._error = 0.0
+
+    @classmethod
+    def from_items(cls, items):
+        # builds a whole cart at once instead of calling add_item for every item
+        cart = cls()
+        cart.items = deque(items)
+        cart._total = math.fsum(map(get_price, cart.items))
+        return cart
 
     def add_item(self, item):
         self.items.append(item)
+        price = item.price
+        total = self._total + price
+        if abs(self._total) >= abs(price):
+            self._error += (self._total - total) + price
+        else:
+            self._error += (price - total) + self._total
+        self._total = total
 
     def calculate_total_price(self):
-        total_price = 0
-        for item in self.items:
-            total_price += item.price
-        return total_price
+        return self._total + self._error
+
+    def freeze(self):
+        return FrozenShoppingCart(self.items)
 
 class Order:
     def __init__(self, cart):